@@ -0,0 +1,31 @@
+"""add updated_at to images
+
+Revision ID: 8d3f1a7c2b45
+Revises: cfb1c2019604
+Create Date: 2026-10-19 10:12:31.482917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d3f1a7c2b45'
+down_revision: Union[str, Sequence[str], None] = 'cfb1c2019604'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('images', sa.Column('updated_at', sa.DateTime(timezone=True),
+                  server_default=sa.text('now()'), nullable=False))
+    op.create_index(op.f('ix_images_updated_at'), 'images', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_images_updated_at'), table_name='images')
+    op.drop_column('images', 'updated_at')
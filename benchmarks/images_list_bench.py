@@ -0,0 +1,115 @@
+"""
+Micro-benchmark for GET /images: the original ORM + default JSON encoder path
+versus the column-tuple + orjson path in images_router.
+
+Runs in-process against a throwaway SQLite database:
+
+    python -m benchmarks.images_list_bench --rows 20000 --requests 500
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+_db_file = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_file}")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from fastapi import APIRouter, Depends, FastAPI, Query
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from shared.database import SessionLocal, init_db
+from shared.models import Image
+from services.api_service.src.dependencies import get_db
+from services.api_service.src.routers.images_router import router as images_router
+
+legacy_router = APIRouter()
+
+
+@legacy_router.get("/legacy/images")
+def legacy_list_images(
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    # Original implementation, kept verbatim for comparison
+    total = db.query(Image).count()
+    rows = db.query(Image).offset(offset).limit(limit).all()
+    items = [
+        {
+            "id": img.id,
+            "name": img.name,
+            "google_drive_id": img.google_drive_id,
+            "size": img.size,
+            "mime_type": img.mime_type,
+            "storage_path": img.storage_path,
+            "url": img.public_url,
+        }
+        for img in rows
+    ]
+    return {"items": items, "total": total, "limit": limit, "offset": offset}
+
+
+def seed(rows: int):
+    init_db()
+    db = SessionLocal()
+    try:
+        if db.query(Image).count() >= rows:
+            return
+        db.bulk_insert_mappings(Image, [
+            {
+                "name": f"img{i}.jpg",
+                "google_drive_id": f"drive-{i}",
+                "size": 1_000_000 + i,
+                "mime_type": "image/jpeg",
+                "storage_path": f"img{i}.jpg",
+                "public_url": f"https://res.cloudinary.com/demo/image/upload/img{i}.jpg",
+            }
+            for i in range(rows)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def run(client: TestClient, path: str, requests: int, rows: int):
+    # warm-up
+    for _ in range(10):
+        client.get(path, params={"limit": 200})
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    for i in range(requests):
+        offset = (i * 200) % max(rows - 200, 1)
+        resp = client.get(path, params={"limit": 200, "offset": offset})
+        resp.raise_for_status()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    return requests / wall, cpu / requests * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    seed(args.rows)
+    app = FastAPI()
+    app.include_router(images_router)
+    app.include_router(legacy_router)
+    client = TestClient(app)
+
+    print(f"{'path':<28}{'req/s':>10}{'cpu ms/req':>14}")
+    for label, path in [("before (ORM + json)", "/legacy/images"), ("after (tuples + orjson)", "/images")]:
+        rps, cpu_ms = run(client, path, args.requests, args.rows)
+        print(f"{label:<28}{rps:>10.1f}{cpu_ms:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,175 @@
-from fastapi import APIRouter, Depends, Query
+import io
+import csv
+import zlib
+import orjson
+from datetime import datetime
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from shared.models import Image
+from shared.database import get_db_session
 from ..dependencies import get_db
 
 router = APIRouter()
 
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FIELDS = [
+    "id", "name", "google_drive_id", "size", "mime_type",
+    "storage_path", "url", "created_at", "updated_at",
+]
+
+
+# API field name -> column, in response order
+IMAGE_LIST_COLUMNS = {
+    "id": Image.id,
+    "name": Image.name,
+    "google_drive_id": Image.google_drive_id,
+    "size": Image.size,
+    "mime_type": Image.mime_type,
+    "storage_path": Image.storage_path,
+    "url": Image.public_url,  # use the Cloudinary URL from DB
+}
+
+
+def _parse_fields(fields: Optional[str]) -> List[str]:
+    requested = [f.strip() for f in (fields or "").split(",") if f.strip()]
+    if not requested:
+        return list(IMAGE_LIST_COLUMNS)
+    unknown = [f for f in requested if f not in IMAGE_LIST_COLUMNS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(IMAGE_LIST_COLUMNS)}",
+        )
+    # keep response order stable and drop duplicates
+    return [f for f in IMAGE_LIST_COLUMNS if f in requested]
+
+
 @router.get("/images")
 def list_images(
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of item fields"),
     db: Session = Depends(get_db)
 ):
-    total = db.query(Image).count()
-    rows = db.query(Image).offset(offset).limit(limit).all()
-
-    items = [
-        {
-            "id": img.id,
-            "name": img.name,
-            "google_drive_id": img.google_drive_id,
-            "size": img.size,
-            "mime_type": img.mime_type,
-            "storage_path": img.storage_path,
-            "url": img.public_url,  # use the Cloudinary URL from DB
-        }
-        for img in rows
-    ]
-
-    return {
-        "items": items,
+    """
+    Page through images. Selects only the requested columns as plain row
+    tuples (no ORM hydration) and serializes with orjson.
+    """
+    names = _parse_fields(fields)
+    total = db.query(func.count(Image.id)).scalar()
+    rows = (
+        db.query(*(IMAGE_LIST_COLUMNS[n] for n in names))
+        .order_by(Image.id)
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+
+    payload = {
+        "items": [dict(zip(names, row)) for row in rows],
         "total": total,
         "limit": limit,
         "offset": offset
     }
+    return Response(content=orjson.dumps(payload), media_type="application/json")
+
+
+def _iter_export_rows(updated_since: Optional[datetime], mime_type: Optional[str]):
+    """Yield export rows as dicts, streaming from a server-side cursor."""
+    db = get_db_session()
+    try:
+        query = db.query(
+            Image.id,
+            Image.name,
+            Image.google_drive_id,
+            Image.size,
+            Image.mime_type,
+            Image.storage_path,
+            Image.public_url,
+            Image.created_at,
+            Image.updated_at,
+        )
+        if updated_since:
+            query = query.filter(Image.updated_at >= updated_since)
+        if mime_type:
+            query = query.filter(Image.mime_type == mime_type)
+
+        for row in query.order_by(Image.id).yield_per(EXPORT_BATCH_SIZE):
+            yield {
+                "id": row.id,
+                "name": row.name,
+                "google_drive_id": row.google_drive_id,
+                "size": row.size,
+                "mime_type": row.mime_type,
+                "storage_path": row.storage_path,
+                "url": row.public_url,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+                "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+            }
+    finally:
+        db.close()
+
+
+def _encode_ndjson(rows):
+    chunk = []
+    for item in rows:
+        chunk.append(orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE))
+        if len(chunk) >= EXPORT_BATCH_SIZE:
+            yield b"".join(chunk)
+            chunk = []
+    if chunk:
+        yield b"".join(chunk)
+
+
+def _encode_csv(rows):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    count = 0
+    for item in rows:
+        writer.writerow(item)
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buf.getvalue().encode()
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@router.get("/images/export")
+def export_images(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    updated_since: Optional[datetime] = Query(None, description="Only rows updated at or after this time"),
+    mime_type: Optional[str] = Query(None),
+    gzip: bool = Query(False),
+):
+    """
+    Stream the whole catalog (or a filtered subset) as NDJSON or CSV.
+    Rows are read through a server-side cursor, so memory stays flat
+    regardless of catalog size.
+    """
+    rows = _iter_export_rows(updated_since, mime_type)
+    if format == "csv":
+        body, media_type = _encode_csv(rows), "text/csv"
+    else:
+        body, media_type = _encode_ndjson(rows), "application/x-ndjson"
+
+    headers = {"Content-Disposition": f'attachment; filename="images.{format}"'}
+    if gzip:
+        body = _gzip(body)
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(body, media_type=media_type, headers=headers)
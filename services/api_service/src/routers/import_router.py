@@ -1,17 +1,26 @@
 # services/api_service/src/api_service/routers/import_router.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
 from pydantic import BaseModel, validator
-from typing import Optional
+from typing import Optional, Tuple
 import re
+import hashlib
+from datetime import datetime, timedelta, timezone
 from redis import Redis
 from rq import Queue
-from shared.config import REDIS_URL
+from shared.config import (
+    REDIS_URL, IMPORT_DEFAULT_JOB_BYTES, IMPORT_API_KEYS, IMPORT_CALLER_QUOTAS, IMPORT_CALLER_MAX_ACTIVE,
+)
+from shared.admission import AdmissionController
+from shared.drive_listing_cache import DriveListingCache, summarize
+from shared.utils import get_drive_service
 
 router = APIRouter()
 
 #connect to redis and create queue
 redis_conn = Redis.from_url(REDIS_URL)
 q = Queue("default", connection=redis_conn)
+listing_cache = DriveListingCache(redis_conn)
+admission = AdmissionController(redis_conn)
 
 class ImportRequest(BaseModel):
     folder_id: Optional[str] = None
@@ -33,28 +42,105 @@ def extract_folder_id_from_url(url: str) -> Optional[str]:
     return None
 
 
+def resolve_folder_id(folder_id: Optional[str], folder_url: Optional[str]) -> str:
+    if not folder_id and folder_url:
+        folder_id = extract_folder_id_from_url(folder_url)
+    if not folder_id:
+        raise HTTPException(status_code=400, detail="folder_id or valid folder_url required")
+    return folder_id
+
+
 # def _call_worker(folder_id: str):
 #     # Import inside function to avoid circular imports at module import time
 #     from services.worker_service.src.worker_service.tasks import import_images_from_drive
 #     return import_images_from_drive(folder_id)
 
 
+def get_caller(request: Request) -> Tuple[str, int]:
+    """
+    Quota bucket and limit for the caller: a configured API key, otherwise the
+    client IP. Keys are only ever stored as a short sha256 label, never in
+    plaintext. Behind a proxy, uvicorn must trust its forwarded headers
+    (--forwarded-allow-ips) for request.client to be the real client.
+    """
+    api_key = request.headers.get("X-API-Key")
+    if api_key and (api_key in IMPORT_API_KEYS or api_key in IMPORT_CALLER_QUOTAS):
+        label = "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:12]
+        return label, int(IMPORT_CALLER_QUOTAS.get(api_key, IMPORT_CALLER_MAX_ACTIVE))
+    host = request.client.host if request.client else "unknown"
+    return f"ip:{host}", IMPORT_CALLER_MAX_ACTIVE
+
+
+def _iso_in(seconds: Optional[int]) -> Optional[str]:
+    if seconds is None:
+        return None
+    return (datetime.now(timezone.utc) + timedelta(seconds=seconds)).isoformat()
+
+
 @router.post("/import/google-drive")
-def import_google_drive(req: ImportRequest):
+def import_google_drive(req: ImportRequest, request: Request):
     """
     Enqueue an image import job to the Redis queue.
     The worker service will process it asynchronously.
+    Rejected with 429 + Retry-After when the queue is overloaded or the
+    caller is over quota.
     """
-    folder_id = req.folder_id
-    if not folder_id and req.folder_url:
-        folder_id = extract_folder_id_from_url(req.folder_url)
-    if not folder_id:
-        raise HTTPException(status_code=400, detail="folder_id or valid folder_url required")
-    
-    
-    job = q.enqueue("services.worker_service.src.tasks.import_images_from_drive", folder_id)
+    folder_id = resolve_folder_id(req.folder_id, req.folder_url)
+    caller, quota = get_caller(request)
+
+    # Size the job from the cached listing when a preview has been run
+    snapshot = listing_cache.load(folder_id)
+    job_bytes = summarize(snapshot)["total_bytes"] if snapshot else IMPORT_DEFAULT_JOB_BYTES
+
+    decision = admission.check(caller, quota, job_bytes, queue_depth=q.count)
+    if not decision.admitted:
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "message": f"Import rejected: {decision.reason}",
+                "retry_after": decision.retry_after,
+                "estimated_start_at": _iso_in(decision.estimated_wait),
+            },
+            headers={"Retry-After": str(decision.retry_after)},
+        )
+
+    job = q.enqueue(
+        "services.worker_service.src.tasks.import_images_from_drive",
+        folder_id,
+        meta={"estimated_bytes": job_bytes},
+    )
+    admission.register(job.id, caller, job_bytes)
     return {
         "message": "Import started in background",
         "folder_id": folder_id,
-        "job_id": job.id
+        "job_id": job.id,
+        "estimated_start_at": _iso_in(decision.estimated_wait)
+    }
+
+
+@router.get("/import/google-drive/preview")
+def preview_google_drive(
+    folder_id: Optional[str] = Query(None),
+    folder_url: Optional[str] = Query(None),
+    refresh: bool = Query(False, description="Force a full re-list from Drive"),
+):
+    """
+    Size an import before starting it: file count and total bytes for a folder,
+    served from the cached Drive listing snapshot when it is fresh.
+    """
+    folder_id = resolve_folder_id(folder_id, folder_url)
+
+    snapshot = listing_cache.load(folder_id)
+    cached = not refresh and listing_cache.is_fresh(snapshot)
+    if not cached:
+        try:
+            snapshot = listing_cache.get_snapshot(get_drive_service(), folder_id, full=refresh)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Failed to list Drive folder: {e}")
+
+    return {
+        "folder_id": folder_id,
+        **summarize(snapshot),
+        "snapshot_at": datetime.fromtimestamp(snapshot["fetched_at"], tz=timezone.utc).isoformat(),
+        "cached": cached,
     }
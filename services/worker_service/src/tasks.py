@@ -1,15 +1,21 @@
 import os
 import io
-import json
+import time
+import socket
 import logging
 import traceback
 import concurrent.futures
 from typing import List, Dict, Optional
+from redis import Redis
 from rq import get_current_job
 from tenacity import retry, stop_after_attempt, wait_exponential
 
-from shared.config import SERVICE_ACCOUNT_JSON
+from shared.config import REDIS_URL
+from shared.admission import AdmissionController
 from shared.cloudinary_client import upload_file
+from shared.drive_listing_cache import DriveListingCache
+from shared.transfer_cache import get_transfer_cache
+from shared.utils import get_drive_service
 from shared.models import Image
 from shared.database import get_db_session, init_db
 
@@ -17,48 +23,106 @@ logger = logging.getLogger(__name__)
 if not logger.handlers:
     logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(name)s: %(message)s")
 
+redis_conn = Redis.from_url(REDIS_URL)
+listing_cache = DriveListingCache(redis_conn)
+admission = AdmissionController(redis_conn)
 
-def get_drive_service():
-    from google.oauth2 import service_account
-    from googleapiclient.discovery import build
 
-    if not SERVICE_ACCOUNT_JSON:
-        raise ValueError("SERVICE_ACCOUNT_JSON is not set in environment variables")
+DOWNLOAD_CHUNK_SIZE = 512 * 1024
 
-    service_account_info = json.loads(SERVICE_ACCOUNT_JSON)
-    creds = service_account.Credentials.from_service_account_info(
-        service_account_info,
-        scopes=["https://www.googleapis.com/auth/drive.readonly"]
-    )
 
-    service = build("drive", "v3", credentials=creds, cache_discovery=False)
-    logger.info("✅ Google Drive service initialized")
-    return service
+def download_resumable(service, file_id: str, dest_path: str, chunksize: int = DOWNLOAD_CHUNK_SIZE) -> int:
+    """
+    Download a Drive file into dest_path chunk by chunk with HTTP Range requests.
+    Whatever is already in dest_path is kept, so a retry resumes from the last
+    completed chunk instead of starting over.
+    """
+    from googleapiclient.errors import HttpError
 
-
-@retry(stop=stop_after_attempt(5), wait=wait_exponential(multiplier=1, min=4, max=10))
-def process_single_file(service, file_data: Dict) -> Dict:
+    request = service.files().get_media(fileId=file_id)
+    offset = os.path.getsize(dest_path) if os.path.exists(dest_path) else 0
+    total: Optional[int] = None
+
+    with open(dest_path, "ab") as out:
+        while total is None or offset < total:
+            headers = dict(request.headers)
+            headers["range"] = f"bytes={offset}-{offset + chunksize - 1}"
+            resp, content = request.http.request(request.uri, request.method, headers=headers)
+
+            if resp.status == 416:
+                # Nothing past offset: the partial file is already complete
+                break
+            if resp.status not in (200, 206):
+                raise HttpError(resp, content, uri=request.uri)
+
+            if resp.status == 200:
+                # Server ignored the range and sent the whole body
+                out.truncate(0)
+                out.write(content)
+                offset = len(content)
+                break
+
+            out.write(content)
+            out.flush()
+            offset += len(content)
+
+            content_range = resp.get("content-range", "")
+            if "/" in content_range and not content_range.endswith("/*"):
+                total = int(content_range.rsplit("/", 1)[1])
+            elif not content or len(content) < chunksize:
+                break
+
+    return offset
+
+
+def download_to_memory(service, file_id: str) -> io.BytesIO:
     from googleapiclient.http import MediaIoBaseDownload
-    import socket
-
-    file_id = file_data["id"]
-    file_name = file_data["name"]
-    mime_type = file_data.get("mimeType")
-    size = int(file_data.get("size")) if file_data.get("size") else None
 
     buffer = io.BytesIO()
     request = service.files().get_media(fileId=file_id)
-    downloader = MediaIoBaseDownload(buffer, request, chunksize=512 * 1024)
+    downloader = MediaIoBaseDownload(buffer, request, chunksize=DOWNLOAD_CHUNK_SIZE)
     done = False
-
-    socket.setdefaulttimeout(600)
     while not done:
         _, done = downloader.next_chunk()
 
     buffer.seek(0)
-    logger.info(f"✅ Downloaded {file_name} ({len(buffer.getvalue())} bytes)")
+    return buffer
+
+
+@retry(stop=stop_after_attempt(5), wait=wait_exponential(multiplier=1, min=4, max=10))
+def process_single_file(service, file_data: Dict) -> Dict:
+    file_id = file_data["id"]
+    file_name = file_data["name"]
+    mime_type = file_data.get("mimeType")
+    size = int(file_data.get("size")) if file_data.get("size") else None
+
+    socket.setdefaulttimeout(600)
+    cache = get_transfer_cache()
+
+    if cache is None:
+        buffer = download_to_memory(service, file_id)
+        logger.info(f"✅ Downloaded {file_name} ({len(buffer.getvalue())} bytes)")
+        public_url = upload_file(buffer, file_name, content_type=mime_type)
+    else:
+        key = cache.key_for(file_data)
+        with cache.pinned(key):
+            path = cache.get(key)
+            cached = True
+            if path:
+                logger.info(f"♻️ Using cached copy of {file_name}")
+            else:
+                downloaded = download_resumable(service, file_id, cache.partial_path_for(key))
+                logger.info(f"✅ Downloaded {file_name} ({downloaded} bytes)")
+                path = cache.commit(key, md5=file_data.get("md5Checksum"))
+                if path is None:
+                    # Larger than the whole cache: upload from the partial, then drop it
+                    path, cached = cache.partial_path_for(key), False
+
+            with cache.open(path) as fobj:
+                public_url = upload_file(fobj, file_name, content_type=mime_type)
+            if not cached:
+                cache.discard(key)
 
-    public_url = upload_file(buffer, file_name, content_type=mime_type)
     logger.info(f"✅ Uploaded {file_name} to Cloudinary at {public_url}")
 
     return {
@@ -74,44 +138,45 @@ def process_single_file(service, file_data: Dict) -> Dict:
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=0.5, min=1, max=5))
 def download_and_upload_to_cloudinary(folder_id: str, max_workers: int = 1) -> List[Dict]:
     service = get_drive_service()
-    query = f"'{folder_id}' in parents and mimeType contains 'image/'"
-    page_token: Optional[str] = None
-    all_files: List[Dict] = []
-
-    while True:
-        results = service.files().list(
-            q=query,
-            pageSize=1000,
-            pageToken=page_token,
-            corpora="allDrives",
-            includeItemsFromAllDrives=True,
-            supportsAllDrives=True,
-            fields="nextPageToken, files(id, name, mimeType, size)"
-        ).execute()
-
-        files = results.get("files", [])
-        all_files.extend(files)
-        page_token = results.get("nextPageToken")
-        if not page_token:
-            break
+    # Always refresh (max_age=0) so the import sees the folder's actual contents:
+    # replaying Drive changes since the cached snapshot is usually one call,
+    # versus re-paging the whole folder.
+    all_files = listing_cache.list_files(service, folder_id, max_age=0)
 
     if not all_files:
         logger.warning("⚠️ No image files found in the folder")
         return []
 
+    # Feed admission control: actual job size, then per-file progress and the
+    # busy time between completions (which is this worker's transfer rate)
+    job = get_current_job()
+    worker_name = (job.worker_name if job else None) or socket.gethostname()
+    if job:
+        admission.set_remaining(job.id, sum(int(f.get("size") or 0) for f in all_files))
+
     uploaded: List[Dict] = []
     with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
         future_to_file = {executor.submit(process_single_file, service, f): f for f in all_files}
+        last_done = time.monotonic()
         for future in concurrent.futures.as_completed(future_to_file):
             file_data = future_to_file[future]
+            succeeded = False
             try:
                 result = future.result()
                 if result["status"] == "success":
                     uploaded.append(result)
+                    succeeded = True
             except Exception as e:
                 logger.error(f"❌ Failed processing {file_data['name']}: {str(e)}")
                 logger.error(traceback.format_exc())
 
+            now = time.monotonic()
+            if job:
+                admission.record_progress(
+                    job.id, worker_name, int(file_data.get("size") or 0), now - last_done, transferred=succeeded
+                )
+            last_done = now
+
     logger.info(f"✅ Uploaded {len(uploaded)}/{len(all_files)} files successfully")
     return uploaded
 
@@ -178,6 +243,8 @@ def import_images_from_drive(folder_id: str) -> dict:
         return error_result
 
     finally:
+        if job_id:
+            admission.release(job_id)
         if db:
             db.close()
             logger.info("🔌 Database session closed")
@@ -0,0 +1,191 @@
+"""
+Shared import admission control - the API checks it before enqueueing, the
+worker feeds it.
+
+State lives in Redis:
+ - import:inflight   hash job_id -> {"bytes", "caller"} for queued and running jobs, where
+                     caller is "ip:<addr>" or "key:<sha256 prefix>" (never the raw key)
+ - import:remaining  hash job_id -> bytes still to transfer (decremented per file)
+ - import:rates      hash worker -> {"rate", "files", "seconds", "updated_at"}, where
+                     rate is an EWMA of bytes per second while the worker is busy;
+                     entries of workers no longer registered with RQ are pruned
+
+Estimated wait = remaining bytes / sum of worker rates. The wait limit is only
+applied once at least one worker has a large enough sample. Checks are not
+atomic with the enqueue, so limits are soft under concurrent bursts.
+"""
+import time
+import math
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import orjson
+from rq import Worker
+from rq.job import Job
+
+from shared.config import (
+    IMPORT_MAX_QUEUE_DEPTH,
+    IMPORT_MAX_INFLIGHT_BYTES,
+    IMPORT_MAX_WAIT_SECONDS,
+    IMPORT_RATE_MAX_AGE_SECONDS,
+    IMPORT_RATE_MIN_FILES,
+    IMPORT_RATE_MIN_SECONDS,
+)
+
+INFLIGHT_KEY = "import:inflight"
+REMAINING_KEY = "import:remaining"
+RATES_KEY = "import:rates"
+RATE_EWMA_ALPHA = 0.2
+DEFAULT_RETRY_AFTER_SECONDS = 30
+MAX_RETRY_AFTER_SECONDS = 3600
+
+
+@dataclass
+class AdmissionDecision:
+    admitted: bool
+    reason: Optional[str] = None
+    retry_after: Optional[int] = None
+    estimated_wait: Optional[int] = None  # seconds until the job is expected to start
+
+
+class AdmissionController:
+    def __init__(self, redis_conn):
+        self.redis = redis_conn
+
+    # ---- worker side -------------------------------------------------------
+
+    def set_remaining(self, job_id: str, nbytes: int):
+        """Replace the enqueue-time estimate with the job's actual size."""
+        self.redis.hset(REMAINING_KEY, job_id, nbytes)
+
+    def record_progress(self, job_id: str, worker: str, nbytes: int, elapsed: float, transferred: bool = True):
+        """
+        Account for one finished file: nbytes are no longer pending for the job,
+        and elapsed busy seconds feed the worker's rate (at 0 bytes/s when the
+        file failed, since the time was spent anyway).
+        """
+        if nbytes:
+            self.redis.hincrby(REMAINING_KEY, job_id, -nbytes)
+        if elapsed <= 0:
+            return
+
+        raw = self.redis.hget(RATES_KEY, worker)
+        stats = orjson.loads(raw) if raw else {"rate": None, "files": 0, "seconds": 0.0}
+        sample = (nbytes if transferred else 0) / elapsed
+        stats["rate"] = sample if stats["rate"] is None else (
+            RATE_EWMA_ALPHA * sample + (1 - RATE_EWMA_ALPHA) * stats["rate"]
+        )
+        stats["files"] += 1
+        stats["seconds"] += elapsed
+        stats["updated_at"] = time.time()
+        self.redis.hset(RATES_KEY, worker, orjson.dumps(stats))
+
+    def release(self, *job_ids: str):
+        pipe = self.redis.pipeline()
+        pipe.hdel(INFLIGHT_KEY, *job_ids)
+        pipe.hdel(REMAINING_KEY, *job_ids)
+        pipe.execute()
+
+    # ---- API side ----------------------------------------------------------
+
+    def register(self, job_id: str, caller: str, nbytes: int):
+        pipe = self.redis.pipeline()
+        pipe.hset(INFLIGHT_KEY, job_id, orjson.dumps({"bytes": nbytes, "caller": caller}))
+        pipe.hset(REMAINING_KEY, job_id, nbytes)
+        pipe.execute()
+
+    def throughput(self) -> Optional[float]:
+        """
+        Combined bytes per busy second of currently registered workers with a
+        recent, large enough sample, or None when there is no such worker yet.
+        """
+        now = time.time()
+        total = 0.0
+        sampled = False
+
+        # RQ names workers with a fresh uuid on every start: drop rates of
+        # workers that are gone so restarts do not inflate capacity
+        registered = {w.name for w in Worker.all(connection=self.redis)}
+        rates = {k.decode(): v for k, v in self.redis.hgetall(RATES_KEY).items()}
+        gone = [name for name in rates if name not in registered]
+        if gone:
+            self.redis.hdel(RATES_KEY, *gone)
+
+        for name, raw in rates.items():
+            if name not in registered:
+                continue
+            stats = orjson.loads(raw)
+            if now - stats["updated_at"] > IMPORT_RATE_MAX_AGE_SECONDS:
+                continue
+            if stats["files"] < IMPORT_RATE_MIN_FILES or stats["seconds"] < IMPORT_RATE_MIN_SECONDS:
+                continue
+            total += stats["rate"]
+            sampled = True
+        return total if sampled and total > 0 else None
+
+    def inflight(self) -> Dict[str, Dict]:
+        """
+        Queued/running jobs with their remaining bytes, pruning entries whose
+        job ended without releasing.
+        """
+        entries = {k.decode(): orjson.loads(v) for k, v in self.redis.hgetall(INFLIGHT_KEY).items()}
+        if not entries:
+            return entries
+
+        job_ids = list(entries)
+        stale = [
+            job_id for job_id, job in zip(job_ids, Job.fetch_many(job_ids, connection=self.redis))
+            if job is None or job.ended_at is not None
+        ]
+        if stale:
+            self.release(*stale)
+            for job_id in stale:
+                entries.pop(job_id)
+
+        remaining = self.redis.hmget(REMAINING_KEY, list(entries)) if entries else []
+        for entry, left in zip(entries.values(), remaining):
+            entry["remaining"] = max(int(left), 0) if left is not None else entry["bytes"]
+        return entries
+
+    def check(self, caller: str, quota: int, job_bytes: int, queue_depth: int) -> AdmissionDecision:
+        entries = self.inflight()
+        remaining_bytes = sum(e["remaining"] for e in entries.values())
+        throughput = self.throughput()
+
+        def seconds_to_drain(nbytes: float) -> int:
+            if not throughput:
+                return DEFAULT_RETRY_AFTER_SECONDS
+            return min(max(math.ceil(nbytes / throughput), 1), MAX_RETRY_AFTER_SECONDS)
+
+        estimated_wait = math.ceil(remaining_bytes / throughput) if throughput else None
+        # Roughly how long until one more job finishes
+        one_job = remaining_bytes / max(len(entries), 1)
+
+        caller_active = sum(1 for e in entries.values() if e["caller"] == caller)
+        if caller_active >= quota:
+            # One of the caller's own jobs has to finish first
+            return AdmissionDecision(
+                False, f"caller has {caller_active} active imports (quota {quota})",
+                seconds_to_drain(one_job), estimated_wait,
+            )
+
+        if queue_depth >= IMPORT_MAX_QUEUE_DEPTH:
+            return AdmissionDecision(
+                False, f"import queue is full ({queue_depth} jobs waiting)",
+                seconds_to_drain(one_job), estimated_wait,
+            )
+
+        overflow = remaining_bytes + job_bytes - IMPORT_MAX_INFLIGHT_BYTES
+        if overflow > 0 and entries:
+            return AdmissionDecision(
+                False, "too many bytes already queued for import",
+                seconds_to_drain(overflow), estimated_wait,
+            )
+
+        if estimated_wait is not None and estimated_wait > IMPORT_MAX_WAIT_SECONDS:
+            return AdmissionDecision(
+                False, f"estimated start in {estimated_wait}s exceeds {IMPORT_MAX_WAIT_SECONDS}s",
+                seconds_to_drain((estimated_wait - IMPORT_MAX_WAIT_SECONDS) * throughput), estimated_wait,
+            )
+
+        return AdmissionDecision(True, estimated_wait=estimated_wait)
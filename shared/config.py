@@ -17,5 +17,28 @@ REDIS_URL = os.getenv("REDIS_URL")
 SERVICE_ACCOUNT_JSON = os.getenv("SERVICE_ACCOUNT_JSON")  # full JSON string
 GOOGLE_DRIVE_FOLDER_ID = os.getenv("GOOGLE_DRIVE_FOLDER_ID")  # optional
 
+# Drive folder listing snapshots kept in Redis
+DRIVE_LISTING_TTL_SECONDS = int(os.getenv("DRIVE_LISTING_TTL_SECONDS", "3600"))  # full re-list after this
+DRIVE_LISTING_REFRESH_SECONDS = int(os.getenv("DRIVE_LISTING_REFRESH_SECONDS", "60"))  # delta refresh after this
+
+# Import admission control (API rejects with 429 when any limit is hit)
+IMPORT_MAX_QUEUE_DEPTH = int(os.getenv("IMPORT_MAX_QUEUE_DEPTH", "100"))
+IMPORT_MAX_INFLIGHT_BYTES = int(os.getenv("IMPORT_MAX_INFLIGHT_BYTES", str(20 * 1024 ** 3)))
+IMPORT_MAX_WAIT_SECONDS = int(os.getenv("IMPORT_MAX_WAIT_SECONDS", "3600"))  # max estimated time to start
+IMPORT_DEFAULT_JOB_BYTES = int(os.getenv("IMPORT_DEFAULT_JOB_BYTES", str(256 * 1024 ** 2)))  # when folder size is unknown
+# Worker rates (EWMA of bytes per busy second) older than this are ignored
+IMPORT_RATE_MAX_AGE_SECONDS = int(os.getenv("IMPORT_RATE_MAX_AGE_SECONDS", "3600"))
+# A worker's rate only counts for wait estimates after this much activity
+IMPORT_RATE_MIN_FILES = int(os.getenv("IMPORT_RATE_MIN_FILES", "5"))
+IMPORT_RATE_MIN_SECONDS = int(os.getenv("IMPORT_RATE_MIN_SECONDS", "30"))
+IMPORT_CALLER_MAX_ACTIVE = int(os.getenv("IMPORT_CALLER_MAX_ACTIVE", "5"))
+IMPORT_CALLER_QUOTAS = json.loads(os.getenv("IMPORT_CALLER_QUOTAS", "{}"))  # {"api-key": max_active_jobs}
+# Accepted X-API-Key values (comma-separated); keys in IMPORT_CALLER_QUOTAS are accepted too
+IMPORT_API_KEYS = {k.strip() for k in os.getenv("IMPORT_API_KEYS", "").split(",") if k.strip()}
+
 # Images dir (optional, if still used locally for caching)
 IMAGES_DIR = os.getenv("IMAGES_DIR")
+# Upper bound for the on-disk transfer cache under IMAGES_DIR (LRU-evicted)
+TRANSFER_CACHE_MAX_BYTES = int(os.getenv("TRANSFER_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+# Partial downloads untouched for this long are treated as abandoned and removed
+TRANSFER_CACHE_PARTIAL_MAX_AGE_SECONDS = int(os.getenv("TRANSFER_CACHE_PARTIAL_MAX_AGE_SECONDS", "86400"))
@@ -0,0 +1,193 @@
+"""
+Shared Drive folder listing cache - used by the API (preview) and the worker (imports).
+
+A snapshot of a folder's image metadata is stored in Redis under one key per
+folder, together with a Drive Changes API page token taken just before the
+full listing. Refreshing replays changes().list from that token and applies
+the ones touching the folder (filtered on `parents` client-side), so files
+moved or copied in, edited, trashed, removed or moved out are all picked up
+without re-paging files().list. Imports refresh on every run; previews once the
+snapshot is older than DRIVE_LISTING_REFRESH_SECONDS. The key expires
+DRIVE_LISTING_TTL_SECONDS after the last full listing, and an invalid page
+token also falls back to a full listing.
+"""
+import math
+import time
+import logging
+from typing import Dict, List, Optional
+
+import orjson
+from googleapiclient.errors import HttpError
+
+from shared.config import DRIVE_LISTING_TTL_SECONDS, DRIVE_LISTING_REFRESH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+FILE_FIELDS = "id, name, mimeType, size, md5Checksum, modifiedTime"
+LISTING_FIELDS = f"nextPageToken, files({FILE_FIELDS})"
+CHANGES_FIELDS = f"nextPageToken, newStartPageToken, changes(fileId, removed, file({FILE_FIELDS}, parents, trashed))"
+# Compact per-file row stored in the snapshot, in this order
+FILE_KEYS = ("name", "mimeType", "size", "md5Checksum", "modifiedTime")
+
+
+def list_folder_images(service, folder_id: str) -> List[Dict]:
+    """Page through files().list for the image files in a folder."""
+    query = f"'{folder_id}' in parents and mimeType contains 'image/'"
+    page_token: Optional[str] = None
+    all_files: List[Dict] = []
+    while True:
+        results = service.files().list(
+            q=query,
+            pageSize=1000,
+            pageToken=page_token,
+            corpora="allDrives",
+            includeItemsFromAllDrives=True,
+            supportsAllDrives=True,
+            fields=LISTING_FIELDS
+        ).execute()
+
+        all_files.extend(results.get("files", []))
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            break
+    return all_files
+
+
+def get_folder_drive_id(service, folder_id: str) -> Optional[str]:
+    """Shared drive the folder lives in, or None for My Drive."""
+    folder = service.files().get(fileId=folder_id, fields="driveId", supportsAllDrives=True).execute()
+    return folder.get("driveId")
+
+
+def get_start_page_token(service, drive_id: Optional[str]) -> str:
+    kwargs = {"driveId": drive_id} if drive_id else {}
+    return service.changes().getStartPageToken(supportsAllDrives=True, **kwargs).execute()["startPageToken"]
+
+
+def list_changes(service, page_token: str, drive_id: Optional[str]):
+    """Page through changes().list from page_token; returns (changes, new start token)."""
+    kwargs = {"driveId": drive_id} if drive_id else {}
+    changes: List[Dict] = []
+    while True:
+        results = service.changes().list(
+            pageToken=page_token,
+            pageSize=1000,
+            includeRemoved=True,
+            includeItemsFromAllDrives=True,
+            supportsAllDrives=True,
+            fields=CHANGES_FIELDS,
+            **kwargs
+        ).execute()
+
+        changes.extend(results.get("changes", []))
+        if "newStartPageToken" in results:
+            return changes, results["newStartPageToken"]
+        page_token = results["nextPageToken"]
+
+
+class DriveListingCache:
+    def __init__(self, redis_conn, ttl: int = DRIVE_LISTING_TTL_SECONDS,
+                 refresh_after: int = DRIVE_LISTING_REFRESH_SECONDS):
+        self.redis = redis_conn
+        self.ttl = ttl
+        self.refresh_after = refresh_after
+
+    @staticmethod
+    def _key(folder_id: str) -> str:
+        return f"drive:listing:{folder_id}"
+
+    def load(self, folder_id: str) -> Optional[Dict]:
+        raw = self.redis.get(self._key(folder_id))
+        return orjson.loads(raw) if raw else None
+
+    def save(self, folder_id: str, snapshot: Dict):
+        # The expiry deadline is fixed by the last full listing and stored in the
+        # snapshot, so delta refreshes never extend it (even if the key expired
+        # and is being recreated) and the snapshot is fully re-listed within `ttl`.
+        ex = max(math.ceil(snapshot["expires_at"] - time.time()), 1)
+        self.redis.set(self._key(folder_id), orjson.dumps(snapshot), ex=ex)
+
+    def is_fresh(self, snapshot: Optional[Dict], max_age: Optional[int] = None) -> bool:
+        max_age = self.refresh_after if max_age is None else max_age
+        return bool(snapshot) and time.time() - snapshot["fetched_at"] <= max_age
+
+    def _full_listing(self, service, folder_id: str) -> Dict:
+        drive_id = get_folder_drive_id(service, folder_id)
+        # Token first: changes made while listing are replayed on the next refresh
+        page_token = get_start_page_token(service, drive_id)
+        files = list_folder_images(service, folder_id)
+        logger.info(f"📂 Listed {folder_id}: {len(files)} files")
+        return {
+            "folder_id": folder_id,
+            "drive_id": drive_id,
+            "page_token": page_token,
+            "files": {f["id"]: [f.get(k) for k in FILE_KEYS] for f in files},
+            "expires_at": time.time() + self.ttl,
+        }
+
+    @staticmethod
+    def _apply_changes(snapshot: Dict, changes: List[Dict]):
+        folder_id = snapshot["folder_id"]
+        for change in changes:
+            f = change.get("file") or {}
+            in_folder = (
+                not change.get("removed")
+                and not f.get("trashed")
+                and folder_id in (f.get("parents") or [])
+                and (f.get("mimeType") or "").startswith("image/")
+            )
+            if in_folder:
+                snapshot["files"][change["fileId"]] = [f.get(k) for k in FILE_KEYS]
+            else:
+                snapshot["files"].pop(change["fileId"], None)
+
+    def get_snapshot(self, service, folder_id: str, max_age: Optional[int] = None, full: bool = False) -> Dict:
+        """
+        Return the folder snapshot, refreshing it from the Changes API when it
+        is older than max_age seconds (defaults to refresh_after). A missing or
+        expired snapshot, or full=True, re-lists the whole folder.
+        """
+        snapshot = None if full else self.load(folder_id)
+        if snapshot and (time.time() >= snapshot.get("expires_at", 0) or "page_token" not in snapshot):
+            # Expired, or written before page tokens were tracked
+            snapshot = None
+        if self.is_fresh(snapshot, max_age):
+            return snapshot
+
+        if snapshot:
+            try:
+                changes, snapshot["page_token"] = list_changes(service, snapshot["page_token"], snapshot["drive_id"])
+                self._apply_changes(snapshot, changes)
+                logger.info(f"🔄 Refreshed listing for {folder_id} from {len(changes)} Drive changes")
+            except HttpError as e:
+                logger.warning(f"⚠️ Changes refresh failed for {folder_id} ({e}), re-listing")
+                snapshot = None
+
+        if not snapshot:
+            snapshot = self._full_listing(service, folder_id)
+
+        snapshot["fetched_at"] = time.time()
+        self.save(folder_id, snapshot)
+        return snapshot
+
+    def list_files(self, service, folder_id: str, max_age: Optional[int] = None) -> List[Dict]:
+        """Return the folder's files in the same shape files().list yields."""
+        snapshot = self.get_snapshot(service, folder_id, max_age=max_age)
+        return [{"id": file_id, **dict(zip(FILE_KEYS, row))} for file_id, row in snapshot["files"].items()]
+
+
+def summarize(snapshot: Dict) -> Dict:
+    """File count and total bytes for a snapshot, overall and per MIME type."""
+    total_bytes = 0
+    by_mime_type: Dict[str, Dict[str, int]] = {}
+    for _, mime_type, size, _, _ in snapshot["files"].values():
+        size = int(size) if size else 0
+        total_bytes += size
+        bucket = by_mime_type.setdefault(mime_type or "unknown", {"count": 0, "bytes": 0})
+        bucket["count"] += 1
+        bucket["bytes"] += size
+    return {
+        "file_count": len(snapshot["files"]),
+        "total_bytes": total_bytes,
+        "by_mime_type": by_mime_type,
+    }
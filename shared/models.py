@@ -17,6 +17,7 @@ class Image(Base):
     storage_path = Column(String, nullable=False)
     public_url = Column(String, nullable=True)  # New column for public URL
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False, index=True)
 
 
 # Pydantic schema for API responses
@@ -29,6 +30,7 @@ class ImageSchema(BaseModel):
     storage_path: str
     public_url: Optional[str] = None  # Include in API response
     created_at: Optional[str] = None  # ISO string from DB
+    updated_at: Optional[str] = None  # ISO string from DB
 
     class Config:
         from_attributes = True
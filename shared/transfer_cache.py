@@ -0,0 +1,163 @@
+"""
+Shared on-disk transfer cache - used by the worker to keep downloaded Drive
+bytes around between upload retries and repeat imports.
+
+Entries live under IMAGES_DIR and are keyed by Drive file ID plus the file's
+md5Checksum (or modifiedTime when Drive has no checksum), so a changed file
+never hits a stale entry. Downloads are checked against md5Checksum before
+they are cached. Total size, partial downloads included, is bounded by LRU
+eviction on mtime; abandoned partials are dropped after a maximum age.
+"""
+import io
+import os
+import re
+import mmap
+import time
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Set
+
+from shared.config import IMAGES_DIR, TRANSFER_CACHE_MAX_BYTES, TRANSFER_CACHE_PARTIAL_MAX_AGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+PARTIAL_SUFFIX = ".part"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class TransferCache:
+    def __init__(self, root: str, max_bytes: int, partial_max_age: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.partial_max_age = partial_max_age
+        self._lock = threading.Lock()
+        self._pinned: Set[str] = set()
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def key_for(file_data: Dict) -> str:
+        """Build a filesystem-safe key from the Drive file metadata."""
+        version = file_data.get("md5Checksum") or file_data.get("modifiedTime") or "noversion"
+        return re.sub(r"[^A-Za-z0-9_.-]", "_", f"{file_data['id']}-{version}")
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def partial_path_for(self, key: str) -> str:
+        return self.path_for(key) + PARTIAL_SUFFIX
+
+    @contextmanager
+    def pinned(self, key: str):
+        """Keep evict() away from this key's entry and partial while in use."""
+        with self._lock:
+            self._pinned.add(key)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pinned.discard(key)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached file path (and mark it recently used), or None."""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def commit(self, key: str, md5: Optional[str] = None) -> Optional[str]:
+        """
+        Verify a fully downloaded partial file against the Drive md5Checksum and
+        promote it to a cache entry. Returns None when the file alone is larger
+        than max_bytes: the caller should upload from the partial and discard() it.
+        """
+        partial = self.partial_path_for(key)
+        if md5:
+            digest = hashlib.md5()
+            with open(partial, "rb") as f:
+                for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                    digest.update(block)
+            if digest.hexdigest() != md5:
+                os.remove(partial)
+                raise ValueError(f"Checksum mismatch for {key}: expected {md5}, got {digest.hexdigest()}")
+
+        if os.path.getsize(partial) > self.max_bytes:
+            return None
+
+        path = self.path_for(key)
+        os.replace(partial, path)
+        self.evict()
+        return path
+
+    def discard(self, key: str):
+        try:
+            os.remove(self.partial_path_for(key))
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """
+        Drop least recently used entries until the cache (partials included)
+        fits max_bytes. Partials are only removed once older than
+        partial_max_age, since a retry may still resume them.
+        """
+        now = time.time()
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.root):
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+                is_partial = entry.name.endswith(PARTIAL_SUFFIX)
+                key = entry.name[:-len(PARTIAL_SUFFIX)] if is_partial else entry.name
+                if is_partial and key not in self._pinned and now - st.st_mtime > self.partial_max_age:
+                    self._remove(entry.path, "stale partial")
+                    continue
+                total += st.st_size
+                if not is_partial and key not in self._pinned:
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                if self._remove(path, "entry"):
+                    total -= size
+
+    @staticmethod
+    def _remove(path: str, what: str) -> bool:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        logger.info(f"🧹 Evicted {what} {os.path.basename(path)} from transfer cache")
+        return True
+
+    @staticmethod
+    @contextmanager
+    def open(path: str):
+        """Yield a memory-mapped, file-like view of a cached entry."""
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # mmap refuses zero-length files
+                yield io.BytesIO(b"")
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield mm
+
+
+_transfer_cache: Optional[TransferCache] = None
+
+
+def get_transfer_cache() -> Optional[TransferCache]:
+    """Return the process-wide cache, or None when IMAGES_DIR is not set."""
+    global _transfer_cache
+    if _transfer_cache is None and IMAGES_DIR:
+        _transfer_cache = TransferCache(IMAGES_DIR, TRANSFER_CACHE_MAX_BYTES, TRANSFER_CACHE_PARTIAL_MAX_AGE_SECONDS)
+        # Clear out partials left behind by a previous (killed) worker
+        _transfer_cache.evict()
+    return _transfer_cache
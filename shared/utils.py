@@ -1,16 +1,33 @@
 """
- - Service account: Your app authenticates to Google Drive using the service account JSON file.
+ - Service account: Your app authenticates to Google Drive using the service account JSON
+   (SERVICE_ACCOUNT_JSON env var), so both the API and the worker can build a client.
 
  - build('drive', 'v3', ...): Creates a Drive API client. This is your "remote control" to read files from Drive. """
 
 
 # shared/utils.py
 
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+import json
+import logging
+
+from shared.config import SERVICE_ACCOUNT_JSON
+
+logger = logging.getLogger(__name__)
+
 
 def get_drive_service():
-    credentials = service_account.Credentials.from_service_account_file("service_account.json")
-    service = build('drive', 'v3', credentials=credentials)
-    return service
+    from google.oauth2 import service_account
+    from googleapiclient.discovery import build
 
+    if not SERVICE_ACCOUNT_JSON:
+        raise ValueError("SERVICE_ACCOUNT_JSON is not set in environment variables")
+
+    service_account_info = json.loads(SERVICE_ACCOUNT_JSON)
+    creds = service_account.Credentials.from_service_account_info(
+        service_account_info,
+        scopes=["https://www.googleapis.com/auth/drive.readonly"]
+    )
+
+    service = build("drive", "v3", credentials=creds, cache_discovery=False)
+    logger.info("✅ Google Drive service initialized")
+    return service